@@ -9,42 +9,32 @@ import datetime
 import os
 import html
 import re
-import time
+import asyncio
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import altair as alt
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage
-from brain import create_mind_flow_brain, load_user_profile
-
-# --- Safety Keywords (Guardrails) ---
-SAFETY_KEYWORDS = [
-    # English
-    "suicide",
-    "kill myself",
-    "want to die",
-    "want to end it all",
-    "end my life",
-    "self-harm",
-    "self harm",
-    # Chinese (kept for detection)
-    "自殺",
-    "想死",
-    "不想活了",
-    "活不下去",
-    "想結束一切",
-    "傷害自己",
-]
+from brain import load_user_profile, SPECIALIST_NODES, SAFETY_MESSAGE, SAFETY_RE, SUGGESTION_ROUTES
 
-SAFETY_MESSAGE = (
-    "⚠️ I noticed you mentioned content that may be related to self-harm or life safety.\n\n"
-    "I am an AI and do not have medical or psychological professional qualifications, "
-    "and I cannot provide immediate assistance in emergency situations.\n\n"
-    "👉 If you are in **immediate danger**, please contact your local emergency number (e.g., 911) immediately,\n"
-    "or call your local suicide prevention/mental health hotline, and seek support from family, friends, or trusted people.\n\n"
-    "You deserve to be treated well and to be truly seen and helped."
-)
+# Number of most recent chat messages rendered on each rerun (older ones are behind a toggle)
+RECENT_MESSAGES_N = 30
 
 # --- 🛡️ I/O Guardrails ---
 
+# Prompt injection patterns, precompiled into one case-insensitive regex (no per-call lower() copy or per-pattern scan)
+PROMPT_INJECTION_PATTERNS = [
+    r"ignore\s+all\s+(previous\s+)?instructions?",
+    r"forget\s+(all\s+)?(previous\s+)?(rules?|instructions?)",
+    r"system\s+prompt",
+    r"you\s+are\s+now",
+    r"act\s+as\s+if",
+    r"pretend\s+to\s+be",
+    r"roleplay\s+as",
+]
+PROMPT_INJECTION_RE = re.compile("|".join(f"(?:{pattern})" for pattern in PROMPT_INJECTION_PATTERNS), re.IGNORECASE)
+
 
 def input_guard(user_text: str) -> tuple[bool, str]:
     """
@@ -67,20 +57,8 @@ def input_guard(user_text: str) -> tuple[bool, str]:
         return False, "Your message is too long. Please break it into smaller parts."
 
     # Detect prompt injection attempts (basic protection)
-    dangerous_patterns = [
-        r"ignore\s+all\s+(previous\s+)?instructions?",
-        r"forget\s+(all\s+)?(previous\s+)?(rules?|instructions?)",
-        r"system\s+prompt",
-        r"you\s+are\s+now",
-        r"act\s+as\s+if",
-        r"pretend\s+to\s+be",
-        r"roleplay\s+as",
-    ]
-
-    user_lower = user_text.lower()
-    for pattern in dangerous_patterns:
-        if re.search(pattern, user_lower, re.IGNORECASE):
-            return False, "I cannot process this type of request. Please rephrase your message."
+    if PROMPT_INJECTION_RE.search(user_text):
+        return False, "I cannot process this type of request. Please rephrase your message."
 
     return True, ""
 
@@ -135,6 +113,20 @@ def output_guard(ai_text: str) -> str:
 
     return cleaned
 
+# --- Tool Call Accessors ---
+# LangChain tool calls are dicts (ToolCall TypedDict); attribute access is kept as a fallback for object-style calls
+
+
+def _tool_name(tool_call):
+    """Name of a tool call (dict or object)"""
+    return tool_call.get("name") if isinstance(tool_call, dict) else getattr(tool_call, "name", None)
+
+
+def _tool_args(tool_call) -> dict:
+    """Arguments of a tool call (dict or object), always a dict"""
+    args = tool_call.get("args") if isinstance(tool_call, dict) else getattr(tool_call, "args", None)
+    return args or {}
+
 # --- RLHF Feedback Logging Function ---
 
 
@@ -334,9 +326,14 @@ def save_to_mind_flow_db(timestamp: str, mood: str, energy: int, note: str):
         return None
 
 
+def get_journal_df():
+    """Materialize session journal rows into a DataFrame (only needed at render time)"""
+    return pd.DataFrame(st.session_state.get("journal_rows", []), columns=["Timestamp", "Mood", "Energy", "Note"])
+
+
 def calculate_dashboard_metrics():
     """Calculate dashboard metrics"""
-    journal_db = st.session_state.get("journal_db", pd.DataFrame(columns=["Timestamp", "Mood", "Energy", "Note"]))
+    journal_db = get_journal_df()
 
     if journal_db.empty:
         return {
@@ -403,17 +400,46 @@ def calculate_dashboard_metrics():
     }
 
 
+def render_dashboard_metrics():
+    """Display the Quantified Self metrics (Streak / Avg Energy / Actions)"""
+    metrics = calculate_dashboard_metrics()
+
+    # Use columns to display three key metrics
+    # Order: Streak (left), Avg Energy (middle), Actions (right)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Streak", metrics['current_streak'])
+    with col2:
+        st.metric("Avg Energy", f"{metrics['avg_energy']:.1f}")
+    with col3:
+        st.metric("Actions", metrics["total_actions"])
+
+
+def render_navigation(user_profile):
+    """Display the Navigation System card (12-week vision + daily system)"""
+    if user_profile.get("vision"):
+        with st.container(border=True):
+            st.caption("🔭 12-Week Vision")
+            st.markdown(f"**{user_profile['vision']}**")
+
+            st.divider()
+
+            st.caption("⚙️ Daily System")
+            st.markdown(f"**{user_profile['system']}**")
+    else:
+        with st.container(border=True):
+            st.warning("System not yet established. Please interact with Strategist to set your 12-week vision!")
+
+
 load_dotenv()
 st.set_page_config(page_title="Momentum", page_icon="🧠", layout="wide")
 
-# Initialize journal database (Session State) - Load from CSV or create new
-if "journal_db" not in st.session_state:
+# Initialize journal rows (Session State) - Load from CSV or start empty
+# Rows are kept as a plain list of dicts so appending is O(1); DataFrames are only built at render time
+if "journal_rows" not in st.session_state:
     df_loaded = load_mind_flow_db()
     # All data in mind_flow_db.csv is journal logs, no need to filter by type
-    if not df_loaded.empty:
-        st.session_state.journal_db = df_loaded[["Timestamp", "Mood", "Energy", "Note"]].copy()
-    else:
-        st.session_state.journal_db = pd.DataFrame(columns=["Timestamp", "Mood", "Energy", "Note"])
+    st.session_state.journal_rows = df_loaded[["Timestamp", "Mood", "Energy", "Note"]].to_dict("records")
 
 # CSS Optimization (cleaner interface + message color blocks)
 st.markdown("""
@@ -549,17 +575,10 @@ st.markdown("""
 with st.sidebar:
     # === Quantified Self Dashboard (Top Metrics) ===
     st.header("📊 Quantified Self")
-    metrics = calculate_dashboard_metrics()
-
-    # Use columns to display three key metrics
-    # Order: Streak (left), Avg Energy (middle), Actions (right)
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Streak", metrics['current_streak'])
-    with col2:
-        st.metric("Avg Energy", f"{metrics['avg_energy']:.1f}")
-    with col3:
-        st.metric("Actions", metrics["total_actions"])
+    # Placeholder so the metrics can be redrawn in place after a journal entry (no full rerun)
+    metrics_placeholder = st.empty()
+    with metrics_placeholder.container():
+        render_dashboard_metrics()
 
     st.divider()
 
@@ -585,18 +604,10 @@ with st.sidebar:
     # Load user profile from JSON file
     user_profile = load_user_profile()
 
-    if user_profile.get("vision"):
-        with st.container(border=True):
-            st.caption("🔭 12-Week Vision")
-            st.markdown(f"**{user_profile['vision']}**")
-
-            st.divider()
-
-            st.caption("⚙️ Daily System")
-            st.markdown(f"**{user_profile['system']}**")
-    else:
-        with st.container(border=True):
-            st.warning("System not yet established. Please interact with Strategist to set your 12-week vision!")
+    # Placeholder so the card can be redrawn in place after set_full_plan (no full rerun)
+    navigation_placeholder = st.empty()
+    with navigation_placeholder.container():
+        render_navigation(user_profile)
 
     st.divider()
 
@@ -607,13 +618,16 @@ with st.sidebar:
         st.write("**User Profile Status:**")
         st.json(user_profile)
         st.write("**Journal Data Status:**")
-        st.write(f"- Session State Record Count: {len(st.session_state.journal_db)}")
+        st.write(f"- Session State Record Count: {len(st.session_state.journal_rows)}")
         df_csv = load_mind_flow_db()
         st.write(f"- CSV File Record Count: {len(df_csv)}")
         st.write(f"- CSV File Path: {MIND_FLOW_DB_PATH}")
         if st.button("🗑️ Clear Conversation History (for testing)"):
             if "messages" in st.session_state:
                 del st.session_state.messages
+            # Start a fresh brain thread too; the old one is deleted from the checkpointer once the brain is loaded
+            if "thread_id" in st.session_state:
+                st.session_state.stale_thread_id = st.session_state.pop("thread_id")
             st.rerun()
 
     st.divider()
@@ -629,12 +643,50 @@ if not api_key:
     st.warning("Please enter API Key first to start Momentum.")
     st.stop()
 
+# --- 2.5 Opening Greeting (requested in the background) ---
+
+
+@st.cache_resource(show_spinner=False)
+def get_thread_pool():
+    """Worker threads shared by all sessions for blocking Gemini calls that can overlap with page rendering"""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def fetch_greeting(api_key: str, user_profile: dict):
+    """
+    Get the opening greeting (runs in a worker thread, must not call st.* APIs).
+    Returning user (system set): Starter directly; new user or onboarding incomplete: Strategist.
+    """
+    from brain import get_strategist_greeting, get_returning_user_greeting
+    if user_profile.get("system"):
+        # Default to Starter (action mode), can change to "healer" if Healer is needed
+        return get_returning_user_greeting(
+            api_key=api_key,
+            model="gemini-2.0-flash",
+            plan_state=user_profile,
+            agent_type="starter"  # or "healer" for care mode
+        )
+    return get_strategist_greeting(
+        api_key=api_key,
+        model="gemini-2.0-flash",
+        plan_state=user_profile
+    )
+
+
+# On a new conversation, start the greeting request now so it overlaps with building the brain
+# and rendering the title / suggestion buttons; the result is collected when the chat is initialized
+greeting_future = None
+if "messages" not in st.session_state:
+    greeting_key = (user_profile.get("vision"), user_profile.get("system"))
+    if greeting_key not in st.session_state.get("greeting_cache", {}):
+        greeting_future = get_thread_pool().submit(fetch_greeting, api_key, user_profile)
+
 # --- 3. Initialize Brain ---
-# Create callback function to update journal
+# Journal update function (called when the Architect's save_journal_entry tool call comes back)
 
 
 def update_journal(mood: str, energy: int, note: str):
-    """Callback function to update journal database (updates both session_state and CSV)"""
+    """Update journal database (updates both session_state and CSV)"""
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
     new_entry = {
         "Timestamp": timestamp,
@@ -642,11 +694,8 @@ def update_journal(mood: str, energy: int, note: str):
         "Energy": energy,
         "Note": note
     }
-    # Update session_state
-    st.session_state.journal_db = pd.concat(
-        [st.session_state.journal_db, pd.DataFrame([new_entry])],
-        ignore_index=True
-    )
+    # Update session_state (append the raw row, no DataFrame copy)
+    st.session_state.journal_rows.append(new_entry)
     # Also save to CSV file (ensure persistence)
     try:
         result = save_to_mind_flow_db(timestamp, mood, energy, note)
@@ -658,13 +707,111 @@ def update_journal(mood: str, energy: int, note: str):
         # Even if save fails, continue execution, at least data is in session_state
 
 
-# Use session_state to cache brain instance, avoid recreating each time
-if "mind_flow_app" not in st.session_state:
-    st.session_state.mind_flow_app = create_mind_flow_brain(
-        api_key=api_key,
-        model="gemini-2.0-flash",
-        update_callback=update_journal
+@st.cache_resource(show_spinner=False)
+def get_event_loop():
+    """
+    Single background event loop shared by all sessions.
+    The Gemini async client is bound to the loop it was first used on, so the shared brain
+    must always run on the same loop (a fresh asyncio.run() per rerun would break it).
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def run_async(coro):
+    """Run a coroutine on the shared event loop and block this script run until it finishes"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+
+def iter_async(agen):
+    """
+    Iterate an async generator on the shared event loop from this (sync) script run.
+    The async generator is always closed on the loop, also when iteration stops early (e.g. a rerun interrupts the run).
+    """
+    try:
+        while True:
+            try:
+                yield run_async(_anext(agen))
+            except StopAsyncIteration:
+                return
+    finally:
+        run_async(agen.aclose())
+
+
+def thread_config():
+    """LangGraph config for this browser session's brain thread"""
+    return {"configurable": {"thread_id": st.session_state.thread_id}}
+
+
+def unsent_messages(messages):
+    """
+    Session messages the brain's thread doesn't hold yet, compared by message id against the checkpointer.
+    Read from the thread itself (not a client-side counter), so a turn that failed after its input
+    was checkpointed is never sent twice.
+    """
+    snapshot = run_async(st.session_state.mind_flow_app.aget_state(thread_config()))
+    held_ids = {msg.id for msg in snapshot.values.get("messages", [])}
+    return [msg for msg in messages if msg.id not in held_ids]
+
+
+def stream_brain(new_messages, final_state: dict, placeholder):
+    """
+    Run the brain on this session's thread and render specialist tokens into placeholder as they arrive.
+    The preview passes through output_guard like the final reply, and each new AI message (e.g. the
+    Strategist's follow-up after a tool call) starts on a new paragraph.
+    Only messages the thread hasn't seen yet are sent; the checkpointer holds the rest of the conversation.
+    The final graph state (messages, reasoning, debug_info) is written into final_state once the run completes.
+    """
+    stream = st.session_state.mind_flow_app.astream(
+        {"messages": new_messages}, config=thread_config(), stream_mode=["messages", "values"]
     )
+    chunks = iter_async(stream)
+    preview = ""
+    current_message_id = None
+    try:
+        for mode, chunk in chunks:
+            if mode == "values":
+                final_state.update(chunk)
+                continue
+            message_chunk, metadata = chunk
+            if metadata.get("langgraph_node") not in SPECIALIST_NODES or not isinstance(message_chunk.content, str):
+                continue
+            if not message_chunk.content:
+                continue
+            if message_chunk.id != current_message_id:
+                if preview:
+                    preview += "\n\n"
+                current_message_id = message_chunk.id
+            preview += message_chunk.content
+            placeholder.markdown(output_guard(preview))
+    finally:
+        chunks.close()
+
+
+@st.cache_resource(show_spinner=False)
+def get_brain(api_key: str, model: str):
+    """
+    Build the Momentum brain once per (api_key, model) and share it across sessions and reruns.
+    No update_callback is bound here (it would close over one session's state);
+    journal entries are persisted from the save_journal_entry tool calls after invoke instead.
+    """
+    # Imported lazily: brain's graph/LLM dependencies are only loaded once the brain is first built
+    from brain import create_mind_flow_brain
+    return create_mind_flow_brain(api_key=api_key, model=model)
+
+
+st.session_state.mind_flow_app = get_brain(api_key, "gemini-2.0-flash")
+
+# Per-browser-session LangGraph thread (messages carry ids, so the thread's contents can be diffed against the session)
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = str(uuid.uuid4())
+if "stale_thread_id" in st.session_state:
+    run_async(st.session_state.mind_flow_app.checkpointer.adelete_thread(st.session_state.pop("stale_thread_id")))
 
 # --- 4. User Interface (UX) ---
 
@@ -676,17 +823,18 @@ tab_chat, tab_dashboard = st.tabs(["💬 Chat", "📊 Dashboard"])
 
 with tab_chat:
     # --- Quick Suggestion Buttons (placed at top of Chat tab) ---
-    suggestions = ["🎯 Set Goal", "😫 I'm Anxious", "🐢 Low Motivation", "✅ Log Completion"]
+    # Labels come from brain.SUGGESTION_ROUTES, so a button press always matches the Supervisor fast route
+    suggestions = list(SUGGESTION_ROUTES)
     cols = st.columns(4)
     selected_prompt = None
 
-    if cols[0].button("🎯 Set Goal", use_container_width=True):
+    if cols[0].button(suggestions[0], use_container_width=True):
         selected_prompt = suggestions[0]
-    if cols[1].button("😫 I'm Anxious", use_container_width=True):
+    if cols[1].button(suggestions[1], use_container_width=True):
         selected_prompt = suggestions[1]
-    if cols[2].button("🐢 Low Motivation", use_container_width=True):
+    if cols[2].button(suggestions[2], use_container_width=True):
         selected_prompt = suggestions[2]
-    if cols[3].button("✅ Log Completion", use_container_width=True):
+    if cols[3].button(suggestions[3], use_container_width=True):
         selected_prompt = suggestions[3]
 
     # Create a container to hold history messages, ensuring it always displays above input box
@@ -696,31 +844,26 @@ with tab_chat:
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
-        # Decide which Agent to use based on user_profile status
-        from brain import get_strategist_greeting, get_returning_user_greeting
-        # Load user profile from JSON file
-        user_profile = load_user_profile()
+        # Greetings are cached per plan state for this session, so clearing the conversation
+        # (or any re-initialization) with an unchanged plan doesn't ask Gemini again
+        greeting_cache = st.session_state.setdefault("greeting_cache", {})
+        greeting_key = (user_profile.get("vision"), user_profile.get("system"))
 
-        # Check if onboarding is complete (system is set)
-        if user_profile.get("system"):
+        # Check if onboarding is complete (system is set); the request itself was started in section 2.5
+        if greeting_key in greeting_cache:
+            greeting_response = greeting_cache[greeting_key]
+        elif user_profile.get("system"):
             # Returning user: Use Starter (action) or Healer (care) directly
-            # Default to Starter (action mode), can change to "healer" if Healer is needed
             with st.spinner("🚀 Starter is preparing greeting (returning user mode)..."):
-                greeting_response = get_returning_user_greeting(
-                    api_key=api_key,
-                    model="gemini-2.0-flash",
-                    plan_state=user_profile,
-                    agent_type="starter"  # or "healer" for care mode
-                )
+                greeting_response = greeting_future.result()
         else:
             # New user or onboarding incomplete: Use Strategist
             with st.spinner("🧠 Strategist is preparing greeting..."):
-                greeting_response = get_strategist_greeting(
-                    api_key=api_key,
-                    model="gemini-2.0-flash",
-                    plan_state=user_profile
-                )
+                greeting_response = greeting_future.result()
 
+        if not greeting_response.id:
+            greeting_response.id = str(uuid.uuid4())
+        greeting_cache[greeting_key] = greeting_response
         st.session_state.messages.append(greeting_response)
 
     # --- Input Area (bottom of Chat tab) ---
@@ -742,29 +885,33 @@ with tab_chat:
 
         if prompt:
             # 1. Add User Message
-            user_msg = HumanMessage(content=prompt)
+            user_msg = HumanMessage(content=prompt, id=str(uuid.uuid4()))
             st.session_state.messages.append(user_msg)
 
             # 1.5 Safety check: self-harm/life-threatening keywords (hard guardrail)
-            lowered = prompt.lower()
-            if any(keyword in lowered for keyword in SAFETY_KEYWORDS):
+            if SAFETY_RE.search(prompt):
                 # Reply directly with fixed template, don't enter brain/don't call any tools
-                safety_ai_message = AIMessage(content=SAFETY_MESSAGE)
+                safety_ai_message = AIMessage(content=SAFETY_MESSAGE, id=str(uuid.uuid4()))
                 st.session_state.messages.append(safety_ai_message)
                 st.warning("⚠️ Safety guardrail mechanism triggered, this conversation round will not enter Momentum brain.")
             else:
                 # 2. Execute Agent (use lightweight prompt, not full-page blurry spinner)
+                # Tokens are streamed live into the status area; the final message is rendered in history below
                 status = st.empty()
                 status.markdown("⏳ Momentum team is collaborating...")
-                result = st.session_state.mind_flow_app.invoke({"messages": st.session_state.messages})
+                result = {}
+                new_messages = unsent_messages(st.session_state.messages)
+                stream_brain(new_messages, result, status)
                 response = result["messages"][-1]
                 status.empty()
 
                 # 2.5 Output Guardrail: Clean AI response before storing/displaying
                 if hasattr(response, 'content') and response.content:
                     cleaned_content = output_guard(response.content)
-                    # Update response content with cleaned version
-                    response.content = cleaned_content
+                    if cleaned_content != response.content:
+                        # Update response content with cleaned version, in the thread too (same id → replaced, not appended)
+                        response.content = cleaned_content
+                        run_async(st.session_state.mind_flow_app.aupdate_state(thread_config(), {"messages": [response]}))
 
                 # 3. Add AI Response
                 st.session_state.messages.append(response)
@@ -774,53 +921,74 @@ with tab_chat:
                     st.session_state.cot_history = []
                 # The index of this AI response is the last one
                 ai_index = len(st.session_state.messages) - 1
-                st.session_state.cot_history.append({"idx": ai_index, "result": result})
+                # Only keep the reasoning fields (result holds the whole thread's messages)
+                cot_result = {"reasoning": result.get("reasoning"), "debug_info": result.get("debug_info")}
+                st.session_state.cot_history.append({"idx": ai_index, "result": cot_result})
 
                 # 4. If there's a Tool Call, show success notification
                 # IMPORTANT: Check ALL messages in result, not just the last one
                 # because Strategist returns [response] + tool_messages + [follow_up_response]
                 # so the tool_calls are in an earlier message, not the last one
                 has_set_full_plan = False
+                has_journal_entry = False
                 tool_call_message = None
 
-                # Find the message with tool_calls (search backwards from the end)
+                # Find the message with tool_calls (search backwards, only within this turn:
+                # the thread state also holds earlier turns, whose tool calls were already handled)
                 for msg in reversed(result["messages"]):
-                    if hasattr(msg, 'tool_calls') and msg.tool_calls:
+                    if isinstance(msg, HumanMessage):
+                        break
+                    if getattr(msg, "tool_calls", None):
                         tool_call_message = msg
                         break
 
                 if tool_call_message:
                     # Check which tool was called
                     for tool_call in tool_call_message.tool_calls:
-                        tool_name = getattr(tool_call, 'name', None) or (tool_call.get('name') if isinstance(tool_call, dict) else None)
+                        tool_name = _tool_name(tool_call)
                         if tool_name == "save_journal_entry":
+                            # Persist the entry for this session (the shared brain has no journal callback)
+                            tool_args = _tool_args(tool_call)
+                            update_journal(tool_args.get("mood"), tool_args.get("energy"), tool_args.get("note"))
+                            has_journal_entry = True
                             st.toast("✨ Journal entry written to database! Check sidebar data.", icon="✅")
                         elif tool_name == "set_full_plan":
                             has_set_full_plan = True
                             st.toast("✨ Plan created! Check sidebar navigation system.", icon="🎯")
 
-                # 5. If any tool called set_full_plan this round (whether demo or regular conversation), wait a bit then rerun to update sidebar
+                # 5. Redraw only the affected sidebar blocks in place (instead of st.rerun() of the whole app)
                 if has_set_full_plan:
-                    time.sleep(0.5)  # Brief pause to let user see the message
-                    st.rerun()      # This line is key! It forces the entire app to rerun
+                    with navigation_placeholder.container():
+                        render_navigation(load_user_profile())
+                if has_journal_entry:
+                    with metrics_placeholder.container():
+                        render_dashboard_metrics()
 
     # Render history messages and RLHF feedback in history_container, ensuring they're always above input box
     with history_container:
+        # Only the most recent messages are rendered by default, so rerun cost stays bounded as the session grows
+        # (earlier messages are only rendered when the user switches the toggle on)
+        messages = st.session_state.messages
+        first_idx = max(0, len(messages) - RECENT_MESSAGES_N)
+        if first_idx > 0 and st.toggle(f"📜 Show earlier messages ({first_idx})", key="show_earlier_messages"):
+            first_idx = 0
+
+        # Supervisor reasoning results indexed by AI message position (one lookup per message)
+        cot_by_idx = {entry.get("idx"): entry.get("result") for entry in st.session_state.get("cot_history", [])}
+
         # Display history messages (including user/agent added this round), and record the last User / Agent pair
         last_user_msg = None
         last_agent_msg = None
-        for idx, msg in enumerate(st.session_state.messages):
+        for idx in range(first_idx, len(messages)):
+            msg = messages[idx]
             if isinstance(msg, HumanMessage):
                 last_user_msg = msg
                 render_message(msg)
             elif isinstance(msg, AIMessage):
                 last_agent_msg = msg
                 # First display Supervisor reasoning result corresponding to this idx (gray block above response)
-                if "cot_history" in st.session_state:
-                    for entry in st.session_state.cot_history:
-                        if entry.get("idx") == idx:
-                            render_supervisor_cot(entry.get("result"))
-                            break
+                if idx in cot_by_idx:
+                    render_supervisor_cot(cot_by_idx[idx])
                 # Then display Agent response itself
                 render_message(msg)
             else:
@@ -864,14 +1032,15 @@ with tab_chat:
 
 with tab_dashboard:
     st.subheader("📊 Flow Journal")
-    if not st.session_state.journal_db.empty:
+    journal_db = get_journal_df()
+    if not journal_db.empty:
         st.write("Last 7 journal entries:")
-        st.dataframe(st.session_state.journal_db.tail(7), hide_index=True)
+        st.dataframe(journal_db.tail(7), hide_index=True)
 
         st.write("Energy Index Trend (Last 7 Days):")
         # Prepare chart data: filter last 7 days of data and group by date to calculate average
         try:
-            journal_db_copy = st.session_state.journal_db.copy()
+            journal_db_copy = journal_db.copy()
             journal_db_copy["Timestamp"] = pd.to_datetime(journal_db_copy["Timestamp"], errors="coerce")
             journal_db_copy["Energy"] = pd.to_numeric(journal_db_copy["Energy"], errors="coerce")
 
@@ -5,13 +5,12 @@ Contains all Agent Prompts, Tools, and Graph logic
 import datetime
 import os
 import json
+import re
 import pandas as pd
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.tools import tool
-from langgraph.graph import StateGraph, END
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from typing import TypedDict, List, Annotated, Dict, Literal
-import operator
+from collections import OrderedDict
+from functools import lru_cache
 from pydantic import BaseModel, Field
 
 
@@ -27,6 +26,7 @@ PLANS_DB_PATH = "plans_database.csv"
 def load_user_profile() -> Dict:
     """
     Load user profile from JSON file (current state)
+    The parsed file is cached per file version (mtime + size), so repeated calls only cost a stat()
     Returns:
         dict: Dictionary containing vision, system, last_updated
     """
@@ -35,19 +35,16 @@ def load_user_profile() -> Dict:
 
     profile_path = os.path.join("data", "user_profile.json")
 
-    if os.path.exists(profile_path):
-        try:
-            with open(profile_path, "r", encoding="utf-8") as f:
-                profile = json.load(f)
-                # Ensure returned structure only contains vision and system
-                return {
-                    "vision": profile.get("vision"),
-                    "system": profile.get("system"),
-                    "last_updated": profile.get("last_updated")
-                }
-        except (json.JSONDecodeError, IOError):
-            # If file is corrupted, return default value
-            pass
+    try:
+        stat = os.stat(profile_path)
+    except OSError:
+        stat = None
+
+    if stat is not None:
+        profile = _read_user_profile(profile_path, stat.st_mtime_ns, stat.st_size)
+        if profile is not None:
+            # Return a copy so callers can't mutate the cached dict
+            return dict(profile)
 
     # Return default structure
     return {
@@ -57,6 +54,23 @@ def load_user_profile() -> Dict:
     }
 
 
+@lru_cache(maxsize=8)
+def _read_user_profile(profile_path: str, mtime_ns: int, size: int):
+    """Parse user profile JSON; cache key includes mtime/size so edits to the file invalidate it. None if corrupted."""
+    try:
+        with open(profile_path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+            # Ensure returned structure only contains vision and system
+            return {
+                "vision": profile.get("vision"),
+                "system": profile.get("system"),
+                "last_updated": profile.get("last_updated")
+            }
+    except (json.JSONDecodeError, IOError):
+        # If file is corrupted, caller returns default value
+        return None
+
+
 def save_user_profile(vision: str, system: str) -> str:
     """
     Save user profile to JSON file (current state)
@@ -83,6 +97,9 @@ def save_user_profile(vision: str, system: str) -> str:
     with open(profile_path, "w", encoding="utf-8") as f:
         json.dump(profile, f, ensure_ascii=False, indent=2)
 
+    # Drop cached reads (mtime may not change between two writes in the same clock tick)
+    _read_user_profile.cache_clear()
+
     return profile_path
 
 
@@ -122,6 +139,38 @@ def save_plan_to_csv(vision: str, system: str):
     return db_path
 
 
+# --- Safety Keywords (Guardrails, shared by app.py and test.py) ---
+SAFETY_KEYWORDS = [
+    # English
+    "suicide",
+    "kill myself",
+    "want to die",
+    "want to end it all",
+    "end my life",
+    "self-harm",
+    "self harm",
+    # Chinese (kept for detection)
+    "自殺",
+    "想死",
+    "不想活了",
+    "活不下去",
+    "想結束一切",
+    "傷害自己",
+]
+
+# Single precompiled pattern: one case-insensitive pass over the input instead of a substring scan per keyword
+SAFETY_RE = re.compile("|".join(re.escape(keyword) for keyword in SAFETY_KEYWORDS), re.IGNORECASE)
+
+SAFETY_MESSAGE = (
+    "⚠️ I noticed you mentioned content that may be related to self-harm or life safety.\n\n"
+    "I am an AI and do not have medical or psychological professional qualifications, "
+    "and I cannot provide immediate assistance in emergency situations.\n\n"
+    "👉 If you are in **immediate danger**, please contact your local emergency number (e.g., 911) immediately,\n"
+    "or call your local suicide prevention/mental health hotline, and seek support from family, friends, or trusted people.\n\n"
+    "You deserve to be treated well and to be truly seen and helped."
+)
+
+
 # --- 1. Define Tools ---
 def create_save_journal_tool(update_callback):
     """
@@ -130,6 +179,8 @@ def create_save_journal_tool(update_callback):
         update_callback: Callback function to update database, receives (mood, energy, note) parameters
                         Should return updated DataFrame or None
     """
+    from langchain_core.tools import tool
+
     @tool
     def save_journal_entry(mood: str, energy: int, note: str):
         """
@@ -152,6 +203,8 @@ def create_set_plan_tool(update_callback):
     Args:
         update_callback: Callback function to update plan, receives (vision, system) parameters
     """
+    from langchain_core.tools import tool
+
     @tool
     def set_full_plan(vision: str, system: str):
         """
@@ -423,6 +476,11 @@ Scenario 3:
 - Extract: mood="tired" or "drained", energy=3 (exhausted), note="Completed walk despite exhaustion"
 """
 
+# Prebuilt SystemMessages for the static prompts (built once at import, reused on every call)
+STRATEGIST_SYS = SystemMessage(content=STRATEGIST_PROMPT)
+HEALER_SYS = SystemMessage(content=HEALER_PROMPT)
+ARCHITECT_SYS = SystemMessage(content=ARCHITECT_PROMPT)
+
 
 # --- Supervisor Structured Output Schema ---
 class SupervisorDecision(BaseModel):
@@ -588,15 +646,142 @@ The system will automatically format your response as structured JSON. Just prov
 """
 
 
+# --- Supervisor Fast Route (skips the routing LLM call for quick suggestion-button presses) ---
+# Quick suggestion buttons shown in app.py → the specialist each one asks for
+# Only these exact strings skip the Supervisor: free text always goes through its priority rules
+# (e.g. "I'm done, I can't do this anymore" must reach HEALER, not ARCHITECT)
+SUGGESTION_ROUTES = {
+    "🎯 Set Goal": "STRATEGIST",
+    "😫 I'm Anxious": "HEALER",
+    "🐢 Low Motivation": "STARTER",
+    "✅ Log Completion": "ARCHITECT",
+}
+
+
+# Number of most recent conversation messages sent to the LLM on each call (the checkpointer keeps the full thread)
+MESSAGE_WINDOW = 12
+
+
+def _fast_route(text: str):
+    """
+    Pre-routing for the latest user message: returns the route (e.g. "HEALER") when it is exactly
+    one of the quick suggestion buttons, otherwise None (→ LLM Supervisor).
+    """
+    if not isinstance(text, str):
+        return None
+    return SUGGESTION_ROUTES.get(text.strip())
+
+
+def _recent_messages(messages: List, window: int = MESSAGE_WINDOW) -> List:
+    """
+    Sliding window over the conversation for LLM calls: the last `window` messages,
+    trimmed to start at a HumanMessage so tool calls are never separated from their ToolMessages.
+    """
+    if len(messages) <= window:
+        return messages
+    recent = messages[-window:]
+    for i, msg in enumerate(recent):
+        if isinstance(msg, HumanMessage):
+            return recent[i:]
+    # No user message inside the window: fall back to everything since the latest one
+    last_human = max((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=len(messages) - window)
+    return messages[last_human:]
+
+
 # --- 3. LangGraph Construction ---
 
+def merge_messages(left: List, right: List) -> List:
+    """
+    Reducer for AgentState.messages: append new messages, but replace a message whose id is already
+    in the thread (so resending a message, or writing back a cleaned version of it, never duplicates it).
+    """
+    merged = list(left)
+    index_by_id = {msg.id: i for i, msg in enumerate(merged) if getattr(msg, "id", None)}
+    for msg in right:
+        msg_id = getattr(msg, "id", None)
+        if msg_id and msg_id in index_by_id:
+            merged[index_by_id[msg_id]] = msg
+        else:
+            if msg_id:
+                index_by_id[msg_id] = len(merged)
+            merged.append(msg)
+    return merged
+
+
 class AgentState(TypedDict, total=False):
-    messages: Annotated[List, operator.add]
+    messages: Annotated[List, merge_messages]
     next_step: str
     debug_info: str  # Debug info: record supervisor routing decision (optional)
     reasoning: str  # Reasoning process: record supervisor's Chain-of-Thought reasoning (optional)
 
 
+# Graph nodes whose LLM tokens are user-facing (Supervisor output is routing only, never streamed to the user)
+SPECIALIST_NODES = ("strategist", "healer", "starter", "architect")
+
+
+# Max number of conversation threads the checkpointer keeps; the least recently used thread is dropped beyond this
+MAX_THREADS = 200
+
+
+def create_checkpointer():
+    """
+    In-memory checkpointer that keeps only the latest checkpoint of each thread (plus its pending writes
+    and the channel blobs it references), for at most MAX_THREADS threads.
+    The brain is shared process-wide, so a plain MemorySaver would keep every checkpoint of every thread forever.
+    """
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    class LatestCheckpointSaver(InMemorySaver):
+        def __init__(self):
+            super().__init__()
+            self.thread_order = OrderedDict()  # thread_id → None, least recently used first
+            self.blob_versions = {}  # (thread_id, checkpoint_ns, channel) → latest stored version
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            saved_config = super().put(config, checkpoint, metadata, new_versions)
+
+            # Drop superseded checkpoints and their writes (only the latest one is ever read back)
+            checkpoints = self.storage[thread_id][checkpoint_ns]
+            for old_id in [cid for cid in checkpoints if cid != checkpoint["id"]]:
+                del checkpoints[old_id]
+                self.writes.pop((thread_id, checkpoint_ns, old_id), None)
+
+            # Drop channel blobs replaced by a newer version
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel)
+                old_version = self.blob_versions.get(key)
+                if old_version is not None and old_version != version:
+                    self.blobs.pop((thread_id, checkpoint_ns, channel, old_version), None)
+                self.blob_versions[key] = version
+
+            self.thread_order[thread_id] = None
+            self.thread_order.move_to_end(thread_id)
+            while len(self.thread_order) > MAX_THREADS:
+                self.delete_thread(next(iter(self.thread_order)))
+            return saved_config
+
+        def delete_thread(self, thread_id):
+            super().delete_thread(thread_id)
+            self.thread_order.pop(thread_id, None)
+            for key in [k for k in self.blob_versions if k[0] == thread_id]:
+                del self.blob_versions[key]
+
+    return LatestCheckpointSaver()
+
+
+# Time-of-day greetings, indexed by hour bucket: morning (5-11), afternoon (12-17), evening (18-4)
+TIME_GREETINGS = ("Good morning", "Good afternoon", "Good evening")
+
+
+def get_time_greeting(hour: int = None) -> str:
+    """Return the time-of-day greeting for the given hour (defaults to the current hour)"""
+    if hour is None:
+        hour = datetime.datetime.now().hour
+    return TIME_GREETINGS[0 if 5 <= hour < 12 else 1 if 12 <= hour < 18 else 2]
+
+
 def get_returning_user_greeting(api_key: str, model: str = "gemini-2.0-flash", plan_state=None, agent_type="starter"):
     """
     Get initial greeting for returning user (onboarding completed)
@@ -608,6 +793,8 @@ def get_returning_user_greeting(api_key: str, model: str = "gemini-2.0-flash", p
         plan_state: Current plan state (dict with vision, system)
         agent_type: "starter" or "healer"
     """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     if plan_state is None:
         plan_state = current_plan
 
@@ -676,6 +863,8 @@ def get_strategist_greeting(api_key: str, model: str = "gemini-2.0-flash", plan_
         plan_state: Current plan state (dict with vision, system, today)
                     If None, will use global variable current_plan
     """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     # If plan_state not provided, use global variable current_plan (defined at top of file)
     if plan_state is None:
         plan_state = current_plan
@@ -719,14 +908,7 @@ Remember: "Winners and losers have the same goals. The difference is the SYSTEM.
 """
     else:
         # Both exist → Regular conversation, can show different greetings
-        import datetime
-        current_hour = datetime.datetime.now().hour
-        if 5 <= current_hour < 12:
-            time_greeting = "Good morning"
-        elif 12 <= current_hour < 18:
-            time_greeting = "Good afternoon"
-        else:
-            time_greeting = "Good evening"
+        time_greeting = get_time_greeting()
 
         context = f"""
 **SPECIAL CONTEXT: The user has a complete plan:
@@ -776,56 +958,67 @@ def create_mind_flow_brain(api_key: str, model: str = "gemini-2.0-flash", update
         api_key: Google API Key
         model: Model name
         update_callback: Callback function to update journal, receives (mood, energy, note) parameters (optional)
+                         Leave as None when the brain is shared across sessions and persist from tool calls instead
         plan_callback: Callback function to update plan, receives (vision, system) parameters (optional)
 
     Returns:
-        Compiled LangGraph application
+        Compiled LangGraph application (nodes are async, run it with `await app.ainvoke(...)`)
+        Use `app.astream(..., stream_mode="messages")` to receive specialist tokens as they are generated;
+        the nodes' ainvoke calls stream automatically in that mode.
+        Conversation state is kept by an in-memory checkpointer: always pass
+        `config={"configurable": {"thread_id": ...}}` and send only the new messages of each turn.
     """
+    # Heavy dependencies are imported here (not at module level) so importing brain stays cheap
+    # for callers that only need load_user_profile / prompts
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langgraph.graph import StateGraph, END
+
     # Initialize LLM
     llm = ChatGoogleGenerativeAI(model=model, google_api_key=api_key)
 
     # Create tools
-    # save_tool needs update_callback (because journal needs to be saved to database)
-    save_tool = None
-    if update_callback is not None:
-        save_tool = create_save_journal_tool(update_callback)
+    # save_tool is always created; update_callback is optional so a shared (cached) brain can leave
+    # persistence to the caller, which reads the save_journal_entry tool call args from the result
+    save_tool = create_save_journal_tool(update_callback)
 
     # plan_tool is always created (because it updates global variable current_plan, should be available even without plan_callback)
     plan_tool = create_set_plan_tool(plan_callback)
 
+    # Tool bindings / structured output wrappers are built once here, not on every node call
+    strategist_llm = llm.bind_tools([plan_tool])
+    architect_llm = llm.bind_tools([save_tool])
+    structured_llm = llm.with_structured_output(SupervisorDecision)
+
     # Nodes
-    def strategist_node(state):
+    async def strategist_node(state):
         # Strategist always binds tools (because plan_tool always exists)
-        llm_with_tools = llm.bind_tools([plan_tool])
-        messages = [SystemMessage(content=STRATEGIST_PROMPT)] + state["messages"]
-        response = llm_with_tools.invoke(messages)
+        history = _recent_messages(state["messages"])
+        response = await strategist_llm.ainvoke([STRATEGIST_SYS, *history])
 
         # If there are tool calls, execute tools
         if hasattr(response, 'tool_calls') and response.tool_calls:
-            from langchain_core.messages import ToolMessage
             tool_messages = []
             for tool_call in response.tool_calls:
                 # Execute tool
-                result = plan_tool.invoke(tool_call["args"])
+                result = await plan_tool.ainvoke(tool_call["args"])
                 tool_messages.append(ToolMessage(content=str(result), tool_call_id=tool_call["id"]))
 
             # After tool execution, let Strategist generate encouraging follow-up message
             # Add tool results to message history, then let LLM generate follow-up response
-            follow_up_messages = [SystemMessage(content=STRATEGIST_PROMPT)] + state["messages"] + [response] + tool_messages
+            follow_up_messages = [STRATEGIST_SYS, *history, response, *tool_messages]
             # Add a prompt to let Strategist know it needs to generate an encouraging follow-up message
             follow_up_prompt = HumanMessage(content="The plan has been saved. Now give a warm, encouraging follow-up message that: 1) Encourages the user (e.g., 'This plan looks solid. I believe you can do this.'), 2) Defines the loop - tell them exactly what to do next ('Go execute your setup action now. When you are done, come back and tell me \"I did it\", and I'll have the Architect log it for you. If you get stuck or feel anxious, come back anytime. The Healer and Starter are standing by.'), 3) End with an open, supportive tone.")
             follow_up_messages.append(follow_up_prompt)
-            follow_up_response = llm.invoke(follow_up_messages)
+            follow_up_response = await llm.ainvoke(follow_up_messages)
 
             return {"messages": [response] + tool_messages + [follow_up_response], "next_step": "END"}
 
         return {"messages": [response], "next_step": "END"}
 
-    def healer_node(state):
-        messages = [SystemMessage(content=HEALER_PROMPT)] + state["messages"]
-        return {"messages": [llm.invoke(messages)], "next_step": "END"}
+    async def healer_node(state):
+        return {"messages": [await llm.ainvoke([HEALER_SYS, *_recent_messages(state["messages"])])], "next_step": "END"}
 
-    def starter_node(state):
+    async def starter_node(state):
         # Load user profile to get system
         current_profile = load_user_profile()
         system = current_profile.get("system")
@@ -849,34 +1042,29 @@ def create_mind_flow_brain(api_key: str, model: str = "gemini-2.0-flash", update
 """
 
         enhanced_prompt = STARTER_PROMPT + context_info
-        messages = [SystemMessage(content=enhanced_prompt)] + state["messages"]
-        return {"messages": [llm.invoke(messages)], "next_step": "END"}
+        messages = [SystemMessage(content=enhanced_prompt), *_recent_messages(state["messages"])]
+        return {"messages": [await llm.ainvoke(messages)], "next_step": "END"}
 
-    def architect_node(state):
+    async def architect_node(state):
         # Architect binds tools
-        if save_tool:
-            llm_with_tools = llm.bind_tools([save_tool])
-        else:
-            llm_with_tools = llm
-        messages = [SystemMessage(content=ARCHITECT_PROMPT)] + state["messages"]
-        response = llm_with_tools.invoke(messages)
+        history = _recent_messages(state["messages"])
+        response = await architect_llm.ainvoke([ARCHITECT_SYS, *history])
 
         # If there are tool calls, execute tools
         if hasattr(response, 'tool_calls') and response.tool_calls:
-            from langchain_core.messages import ToolMessage
             tool_messages = []
             for tool_call in response.tool_calls:
                 # Execute tool
-                result = save_tool.invoke(tool_call["args"])
+                result = await save_tool.ainvoke(tool_call["args"])
                 tool_messages.append(ToolMessage(content=str(result), tool_call_id=tool_call["id"]))
 
             # After tool execution, let Architect generate follow-up message (if response has no text content)
             # Add tool results to message history, then let LLM generate follow-up response
             if not response.content or response.content.strip() == "":
-                follow_up_messages = [SystemMessage(content=ARCHITECT_PROMPT)] + state["messages"] + [response] + tool_messages
+                follow_up_messages = [ARCHITECT_SYS, *history, response, *tool_messages]
                 follow_up_prompt = HumanMessage(content="The journal entry has been saved. Now give a brief, encouraging follow-up message (2-3 sentences max) that: 1) Reinforces their identity ('You are the type of person who takes action'), 2) Gives ONE specific environment design tip for next time, 3) Keeps it brief and supportive.")
                 follow_up_messages.append(follow_up_prompt)
-                follow_up_response = llm.invoke(follow_up_messages)
+                follow_up_response = await llm.ainvoke(follow_up_messages)
                 return {"messages": [response] + tool_messages + [follow_up_response], "next_step": "END"}
             else:
                 # If response already has text content, return directly
@@ -885,12 +1073,24 @@ def create_mind_flow_brain(api_key: str, model: str = "gemini-2.0-flash", update
         return {"messages": [response], "next_step": "END"}
 
     # Supervisor (Router) - State-Aware Routing with Structured Output
-    def supervisor_node(state):
+    async def supervisor_node(state):
         # Check current plan status (State-Aware Routing)
         current_profile = load_user_profile()
         vision_saved = current_profile.get("vision")
         system_saved = current_profile.get("system")
 
+        # Fast route: once onboarding is complete, suggestion-button presses skip the routing LLM call
+        # (during onboarding the Supervisor must still weigh conversation history, so always use the LLM)
+        if vision_saved and system_saved:
+            last_user_text = next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
+            fast_decision = _fast_route(last_user_text)
+            if fast_decision:
+                return {
+                    "next_step": fast_decision.lower(),
+                    "debug_info": f"[🔀 Supervisor routed to: {fast_decision}] (fast route)",
+                    "reasoning": f"Fast route: the latest message is the {fast_decision} quick suggestion button, so the routing LLM call was skipped."
+                }
+
         # Build context information - show both SAVED state and note that conversation may have more info
         context_check = f"""
                         **CONTEXT CHECK:**
@@ -935,14 +1135,12 @@ def create_mind_flow_brain(api_key: str, model: str = "gemini-2.0-flash", update
         # Combine complete Supervisor Prompt
         supervisor_prompt = SUPERVISOR_PROMPT_BASE + context_check + priority_rule
 
-        # Use structured output: bind Pydantic model
-        structured_llm = llm.with_structured_output(SupervisorDecision)
-
-        messages = [SystemMessage(content=supervisor_prompt)] + state["messages"]
+        # Use structured output (Pydantic model bound once above)
+        messages = [SystemMessage(content=supervisor_prompt), *_recent_messages(state["messages"])]
 
         try:
             # Call structured output LLM, directly get SupervisorDecision object
-            decision_result: SupervisorDecision = structured_llm.invoke(messages)
+            decision_result: SupervisorDecision = await structured_llm.ainvoke(messages)
 
             # Extract decision and reasoning process from structured output
             decision = decision_result.decision
@@ -995,14 +1193,12 @@ If not determined, use null. Be concise."""
                     HumanMessage(content=f"Conversation history:\n{chr(10).join([f'{type(msg).__name__}: {msg.content[:200]}' for msg in state['messages'][-10:] if hasattr(msg, 'content')])}")
                 ]
 
-                extraction_response = llm.invoke(extraction_messages)
+                extraction_response = await llm.ainvoke(extraction_messages)
                 extraction_text = extraction_response.content if hasattr(extraction_response, 'content') else str(extraction_response)
 
                 # Try to parse JSON from response
-                import re
                 json_match = re.search(r'\{[^}]+\}', extraction_text, re.DOTALL)
                 if json_match:
-                    import json
                     extracted = json.loads(json_match.group())
                     vision_determined = extracted.get("vision") if extracted.get("vision") and extracted.get("vision").lower() != "null" else None
                     system_determined = extracted.get("system") if extracted.get("system") and extracted.get("system").lower() != "null" else None
@@ -1053,4 +1249,5 @@ If not determined, use null. Be concise."""
     workflow.add_edge("starter", END)
     workflow.add_edge("architect", END)
 
-    return workflow.compile()
+    # Checkpointer keeps each thread's messages between turns, so callers only send the latest turn
+    return workflow.compile(checkpointer=create_checkpointer())
@@ -1,6 +1,6 @@
+import numpy as np
 import pandas as pd
 import datetime
-import random
 import os
 import sys
 
@@ -42,33 +42,36 @@ plan_data.append({
 })
 
 # 2. Generate daily journal logs - saved to mind_flow_db.csv
-journal_data = []
-
-for i in range(7):
-    current_day = base_time + datetime.timedelta(days=i)
-    
-    # Generate 1-2 entries per day
-    for _ in range(random.randint(1, 2)):
-        # Random time (evening)
-        log_time = current_day.replace(
-            hour=random.randint(18, 23), 
-            minute=random.randint(0, 59)
-        )
-        
-        # Energy index (simulate trend from low to high)
-        energy = min(10, random.randint(3, 6) + int(i * 0.5))
-        mood = random.choice(moods)
-        note = random.choice(notes)
-        
-        journal_data.append({
-            "Timestamp": log_time.strftime("%Y-%m-%d %H:%M"),
-            "Mood": mood,
-            "Energy": energy,
-            "Note": note
-        })
+# All columns are generated as arrays at once (no per-row Python loop), fixed seed for reproducible demo data
+rng = np.random.default_rng(42)
+num_days = 7
+
+# Generate 1-2 entries per day; days[k] is the day offset of entry k
+days = np.repeat(np.arange(num_days), rng.integers(1, 3, num_days))
+num_entries = len(days)
+
+# Random time (evening)
+hours = rng.integers(18, 24, num_entries)
+minutes = rng.integers(0, 60, num_entries)
+log_times = (
+    pd.Timestamp(base_time).normalize()
+    + pd.to_timedelta(days, unit="D")
+    + pd.to_timedelta(hours, unit="h")
+    + pd.to_timedelta(minutes, unit="m")
+)
+
+# Energy index (simulate trend from low to high)
+energy = np.minimum(10, rng.integers(3, 7, num_entries) + (days * 0.5).astype(int))
+
+# Build journal DataFrame in a single construction
+df_journal = pd.DataFrame({
+    "Timestamp": log_times.strftime("%Y-%m-%d %H:%M"),
+    "Mood": np.array(moods)[rng.integers(0, len(moods), num_entries)],
+    "Energy": energy,
+    "Note": np.array(notes)[rng.integers(0, len(notes), num_entries)]
+})
 
 # Save journal data to CSV
-df_journal = pd.DataFrame(journal_data)
 df_journal.to_csv(JOURNAL_DB_PATH, index=False, encoding="utf-8")
 print(f"✅ Generated {len(df_journal)} journal entries to {JOURNAL_DB_PATH}")
 
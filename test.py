@@ -3,38 +3,13 @@ Momentum Test - Terminal Test Script
 For quickly testing brain logic without starting Streamlit interface
 """
 import os
+import asyncio
 import datetime
+import uuid
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage
 from brain import create_mind_flow_brain, get_strategist_greeting, get_returning_user_greeting, load_user_profile
-
-# --- Safety Keywords (Guardrails) ---
-SAFETY_KEYWORDS = [
-    # English
-    "suicide",
-    "kill myself",
-    "want to die",
-    "want to end it all",
-    "end my life",
-    "self-harm",
-    "self harm",
-    # Chinese (kept for detection)
-    "自殺",
-    "想死",
-    "不想活了",
-    "活不下去",
-    "想結束一切",
-    "傷害自己",
-]
-
-SAFETY_MESSAGE = (
-    "⚠️ I noticed you mentioned content that may be related to self-harm or life safety.\n"
-    "I am an AI and do not have medical or psychological professional qualifications, "
-    "and I cannot provide immediate assistance in emergency situations.\n\n"
-    "👉 If you are in **immediate danger**, please contact your local emergency number (e.g., 911) immediately,\n"
-    "or call your local suicide prevention/mental health hotline, and seek support from family, friends, or trusted people.\n\n"
-    "You deserve to be treated well and to be truly seen and helped."
-)
+from brain import SAFETY_MESSAGE, SAFETY_RE
 
 
 class ConversationLogger:
@@ -80,7 +55,7 @@ class ConversationLogger:
         print(f"\n💾 Conversation log saved to: {self.log_file}")
 
 
-def main():
+async def main():
     """Main test loop"""
     # Initialize conversation logger
     logger = ConversationLogger()
@@ -104,6 +79,9 @@ def main():
         # Create brain (not using journal_db, as terminal test doesn't need persistence)
         app = create_mind_flow_brain(api_key=api_key, model="gemini-2.0-flash")
         
+        # Brain keeps conversation state per thread (checkpointer), so only new messages are sent each turn
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
         # Initialize conversation - decide which Agent to use based on user_profile status
         messages = []
         user_profile = load_user_profile()
@@ -129,6 +107,8 @@ def main():
             )
         
         logger.write(f"🤖 {greeting_response.content}\n")
+        if not greeting_response.id:
+            greeting_response.id = str(uuid.uuid4())
         messages.append(greeting_response)
         
         # Conversation loop
@@ -148,8 +128,7 @@ def main():
             logger.file.flush()
 
             # --- Safety check: self-harm/life-threatening keywords ---
-            lowered = user_input.lower()
-            if any(keyword in lowered for keyword in SAFETY_KEYWORDS):
+            if SAFETY_RE.search(user_input):
                 # Reply directly with fixed safety message, don't enter brain/don't execute any tools
                 logger.write("\n⚠️ [Safety guardrail triggered - skipping brain routing and tool calls]\n")
                 logger.write(f"🤖 {SAFETY_MESSAGE}\n")
@@ -157,12 +136,16 @@ def main():
                 continue
 
             # Add user message
-            messages.append(HumanMessage(content=user_input))
+            messages.append(HumanMessage(content=user_input, id=str(uuid.uuid4())))
             
             # Execute brain
             logger.write("\n🤔 Momentum team is collaborating...\n")
             try:
-                result = app.invoke({"messages": messages})
+                # Send only messages the thread doesn't hold yet (by id), read from the checkpointer itself
+                snapshot = await app.aget_state(config)
+                held_ids = {msg.id for msg in snapshot.values.get("messages", [])}
+                new_messages = [msg for msg in messages if msg.id not in held_ids]
+                result = await app.ainvoke({"messages": new_messages}, config=config)
                 
                 # Debug: display supervisor reasoning process and routing info
                 if result.get("reasoning"):
@@ -182,8 +165,10 @@ def main():
                 response = None
                 tool_call_message = None
                 
-                # Find last AIMessage from back to front
+                # Find last AIMessage from back to front (only within this turn, the thread also holds earlier turns)
                 for msg in reversed(result["messages"]):
+                    if isinstance(msg, HumanMessage):
+                        break
                     if isinstance(msg, AIMessage):
                         if response is None:
                             response = msg  # Last AIMessage
@@ -245,5 +230,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 